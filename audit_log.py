@@ -0,0 +1,221 @@
+"""당직 배정 이벤트 감사 로그 (append-only).
+
+DATA_DIR/audit/
+  seg-000001.log ...      JSON Lines 세그먼트 (크기 초과 시 다음 세그먼트로)
+  idx/month-2026_03.idx   월별 인덱스
+  idx/member-<이름>.idx    팀원별 인덱스
+
+인덱스 한 줄은 "세그먼트번호 오프셋 길이" 로, 조회 시 해당 레코드만 읽는다.
+기록은 백그라운드 스레드가 처리하므로 log_event() 는 큐에 넣고 바로 반환한다.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from urllib.parse import quote
+
+import storage
+
+try:
+    import fcntl
+    FCNTL = True
+except ImportError:  # Windows 개발 환경
+    FCNTL = False
+
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def audit_dir():
+    return os.path.join(storage.DATA_DIR, "audit")
+
+
+def _index_path(name):
+    return os.path.join(audit_dir(), "idx", f"{quote(name, safe='')}.idx")
+
+
+def _segment_path(seg):
+    return os.path.join(audit_dir(), f"seg-{seg:06d}.log")
+
+
+def _month_key(year, month):
+    return f"month-{year}_{month:02d}"
+
+
+def _member_key(name):
+    return f"member-{name}"
+
+
+# --- 기록 ---
+def log_event(kind, actor, year, month, slot=None, member=None, deltas=None):
+    """이벤트를 큐에 넣는다 (rerun 경로에서 디스크 I/O 없음).
+
+    kind: assign / manual / pass / undo
+    actor: 조작한 주체. 로그인이 없으므로 Streamlit 세션 id 를 남긴다 (member 는 배정 대상)
+    deltas: {이름: 잔여 횟수 변화량}
+    """
+    entry = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "kind": kind, "actor": actor,
+        "year": year, "month": month, "slot": slot, "member": member,
+        "deltas": {k: v for k, v in (deltas or {}).items() if v},
+    }
+    _ensure_writer()
+    _queue.put(entry)
+
+
+def flush():
+    """큐에 쌓인 이벤트가 모두 기록될 때까지 대기"""
+    _queue.join()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, name="audit-log", daemon=True)
+            _writer.start()
+
+
+def _writer_loop():
+    while True:
+        batch = [_queue.get()]
+        while True:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _append(batch)
+        except OSError as e:
+            print(f"[audit_log] Error writing {len(batch)} events: {e}")
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _current_segment():
+    segs = [int(f[4:10]) for f in os.listdir(audit_dir())
+            if f.startswith("seg-") and f.endswith(".log")]
+    seg = max(segs, default=1)
+    path = _segment_path(seg)
+    if os.path.exists(path) and os.path.getsize(path) >= SEGMENT_MAX_BYTES:
+        seg += 1
+    return seg
+
+
+def _append(batch):
+    os.makedirs(os.path.join(audit_dir(), "idx"), exist_ok=True)
+    lock_fd = os.open(os.path.join(audit_dir(), ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if FCNTL:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        seg = _current_segment()
+        index_lines = {}
+        f = open(_segment_path(seg), 'ab')
+        try:
+            offset = f.tell()
+            for entry in batch:
+                # 배치 중간에도 크기를 넘으면 다음 세그먼트로
+                if offset >= SEGMENT_MAX_BYTES:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    seg += 1
+                    f = open(_segment_path(seg), 'ab')
+                    offset = f.tell()
+                line = (json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+                f.write(line)
+                ref = f"{seg} {offset} {len(line)}\n"
+                keys = {_month_key(entry['year'], entry['month'])}
+                keys.update(_member_key(n) for n in entry['deltas'])
+                if entry['member']:
+                    keys.add(_member_key(entry['member']))
+                for k in keys:
+                    index_lines.setdefault(k, []).append(ref)
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        # 세그먼트를 먼저 기록한 뒤 인덱스를 추가 (인덱스가 없는 레코드를 가리키지 않도록)
+        for k, lines in index_lines.items():
+            with open(_index_path(k), 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+    finally:
+        if FCNTL:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        os.close(lock_fd)
+
+
+atexit.register(flush)
+
+
+# --- 조회 ---
+def _read_refs(key):
+    try:
+        with open(_index_path(key), 'r', encoding='utf-8') as f:
+            return [tuple(int(x) for x in line.split()) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _load(refs):
+    """(세그먼트, 오프셋, 길이) 목록의 레코드만 읽는다"""
+    out = []
+    handles = {}
+    try:
+        for seg, offset, length in refs:
+            if seg not in handles:
+                handles[seg] = open(_segment_path(seg), 'rb')
+            f = handles[seg]
+            f.seek(offset)
+            out.append(json.loads(f.read(length)))
+    finally:
+        for f in handles.values():
+            f.close()
+    return out
+
+
+def _scan_all():
+    if not os.path.isdir(audit_dir()):
+        return []
+    out = []
+    for name in sorted(os.listdir(audit_dir())):
+        if name.startswith("seg-") and name.endswith(".log"):
+            with open(os.path.join(audit_dir(), name), 'r', encoding='utf-8') as f:
+                out.extend(json.loads(line) for line in f if line.strip())
+    return out
+
+
+def query(year=None, month=None, member=None, slot=None, kind=None):
+    """조건에 맞는 이벤트 목록 (기록 순).
+
+    예) query(2026, 3, slot=17)      3월 17번 슬롯의 모든 변경
+        query(2026, kind="pass")     올해의 모든 패스
+    """
+    if member is not None:
+        entries = _load(_read_refs(_member_key(member)))
+    elif year is not None and month is not None:
+        entries = _load(_read_refs(_month_key(year, month)))
+    elif year is not None:
+        refs = []
+        for m in range(1, 13):
+            refs.extend(_read_refs(_month_key(year, m)))
+        entries = _load(sorted(refs))
+    else:
+        entries = _scan_all()
+
+    return [
+        e for e in entries
+        if (year is None or e['year'] == year)
+        and (month is None or e['month'] == month)
+        and (slot is None or e['slot'] == slot)
+        and (kind is None or e['kind'] == kind)
+    ]
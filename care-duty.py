@@ -1,11 +1,12 @@
 import streamlit as st
-import random
 import calendar
 import io
 import copy
 import json
 import os
+import uuid
 from datetime import date
+from functools import partial
 
 try:
     import holidays as holidays_lib
@@ -16,6 +17,11 @@ except ImportError:
 from openpyxl import Workbook
 from openpyxl.styles import Alignment, PatternFill, Border, Side, Font
 
+import audit_log
+import draft
+import export
+import storage
+
 # --- 1. 전역 설정 ---
 calendar.setfirstweekday(calendar.SUNDAY)
 MEMBERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "members.json")
@@ -38,16 +44,16 @@ def get_holidays(year, month):
         return [d.day for d in kr.keys() if d.year == year and d.month == month]
     return HOLIDAY_FALLBACK.get(year, {}).get(month, [])
 
-# --- 팀원 파일 영속 관리 ---
+# --- 팀원 파일 영속 관리 (Next.js 와 같은 DATA_DIR/members.json 공유) ---
 def load_members():
-    if os.path.exists(MEMBERS_FILE):
+    if not os.path.exists(storage.data_path("members.json")) and os.path.exists(MEMBERS_FILE):
+        # 예전 위치(스크립트 옆 members.json)에서 이전
         with open(MEMBERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return DEFAULT_MEMBERS.copy()
+            storage.save_members(json.load(f))
+    return storage.load_members(DEFAULT_MEMBERS)
 
 def save_members(members):
-    with open(MEMBERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(members, f, ensure_ascii=False, indent=2)
+    storage.save_members(members)
 
 # --- 2. 세션 상태 초기화 ---
 if 'member_list' not in st.session_state:
@@ -58,13 +64,21 @@ def get_members():
 
 REQUIRED_KEYS = {
     'quotas': {}, 'selection_order': [], 'current_picker_idx': 0, 'slots': [],
+    'members': [], 'undo_depth': 0, 'draft': None,
     'absentees': set(), 'absentee_prefs': {},
-    'history': [], 'manual_mode': False, 'admin_selected_member': None,
-    'quota_info': None, 'pass_log': "", 'undo_triggered': False
+    'manual_mode': False, 'admin_selected_member': None,
+    'quota_info': None, 'pass_log': "", 'undo_triggered': False,
+    'notice': None, 'confirm_reinit': False, 'schedule_conflict': None
 }
+# draft.replay() 가 재구성하는 상태 키
+DRAFT_KEYS = ('slots', 'members', 'quotas', 'selection_order', 'current_picker_idx',
+              'quota_info', 'pass_log', 'undo_depth')
 for key, default in REQUIRED_KEYS.items():
     if key not in st.session_state:
         st.session_state[key] = copy.deepcopy(default)
+# 감사 로그의 actor (로그인이 없어 브라우저 세션 단위로 구분)
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = f"session-{uuid.uuid4().hex[:8]}"
 
 # absentee_prefs 멤버 동기화
 for name in get_members():
@@ -75,46 +89,119 @@ if st.session_state.admin_selected_member is None and get_members():
     st.session_state.admin_selected_member = get_members()[0]
 
 # --- 3. 핵심 제어 함수 ---
-def save_history():
-    snapshot = {
-        'slots': copy.deepcopy(st.session_state.slots),
-        'quotas': copy.deepcopy(st.session_state.quotas),
-        'current_picker_idx': st.session_state.current_picker_idx,
-        'pass_log': st.session_state.pass_log
-    }
-    st.session_state.history.append(snapshot)
-    if len(st.session_state.history) > 20:
-        st.session_state.history.pop(0)
+def sync_draft(year, month):
+    """저장된 draft 가 세션의 것과 다르면(다른 세션의 이벤트, 재초기화) 다시 replay.
+
+    선택한 달의 draft 가 없으면 이전 달의 상태를 비운다 (그 달 파일에 기록되지 않도록).
+    """
+    saved = storage.load_draft(year, month)
+    d = st.session_state.draft
+    if saved is None:
+        if d is not None:
+            st.session_state.draft = None
+            st.session_state.update({k: copy.deepcopy(REQUIRED_KEYS[k]) for k in DRAFT_KEYS})
+    elif d is None or ((d['year'], d['month'], d['seed'], len(d['events']))
+                       != (saved['year'], saved['month'], saved['seed'], len(saved['events']))):
+        st.session_state.draft = saved
+        st.session_state.update(draft.replay(saved))
+
+def publish_schedule(d):
+    """Next.js(/api/schedule) 와 공유하는 배정표 게시. 그쪽에서 고친 파일은 덮어쓰지 않고 경고만 남긴다."""
+    if storage.save_schedule(d['year'], d['month'], st.session_state.slots,
+                             draft_version=(d['seed'], len(d['events']))):
+        st.session_state.schedule_conflict = None
+    else:
+        st.session_state.schedule_conflict = (d['year'], d['month'])
+
+def start_new_draft(year, month):
+    new_draft = draft.new_draft(year, month, get_holidays(year, month))
+    storage.init_draft(new_draft)
+    st.session_state.draft = new_draft
+    st.session_state.update(draft.replay(new_draft))
+    st.session_state.undo_triggered = False
+    publish_schedule(new_draft)
+    st.rerun()
 
-def find_next_valid_picker():
-    if not st.session_state.selection_order:
+def record(event, seen):
+    """추첨 이벤트를 draft 파일에 append → 적용 → 감사 로그 (되돌리기는 draft.replay 로 재구성)
+
+    seen 은 화면을 그릴 때의 이벤트 수. 그 뒤 다른 세션이 이벤트를 남겼으면(낡은 화면에서 누른 것)
+    이번 이벤트는 버리고 최신 기록으로 다시 구성한다.
+    """
+    d = st.session_state.draft
+    if d is None:
+        return False
+    if len(d['events']) != seen or not storage.append_draft_event(d['year'], d['month'], seen, event):
+        sync_draft(d['year'], d['month'])
+        st.session_state.notice = ("warning", "다른 사용자가 먼저 변경하여 최신 상태로 다시 불러왔습니다. "
+                                              "다시 선택해 주세요.")
+        return False
+
+    before_q = dict(st.session_state.quotas)
+    before_owners = [sl['owner'] for sl in st.session_state.slots]
+    state = draft.apply_event(d, {k: st.session_state[k] for k in DRAFT_KEYS}, event)
+    st.session_state.update(state)
+
+    op = event['op']
+    if op in draft.UNDOABLE or op == "undo":
+        deltas = {k: st.session_state.quotas.get(k, 0) - before_q.get(k, 0)
+                  for k in set(before_q) | set(st.session_state.quotas)}
+        if op == "undo":
+            changed = [i for i, o in enumerate(before_owners)
+                       if o != st.session_state.slots[i]['owner']]
+            slot_id = changed[0] if changed else None
+            member = before_owners[slot_id] if changed else None
+            kind = "undo"
+        else:
+            slot_id, member = event.get('slot'), event['member']
+            kind = "manual" if event.get('manual') else op
+        audit_log.log_event(kind, st.session_state.session_id, d['year'], d['month'],
+                            slot=slot_id, member=member, deltas=deltas)
+    publish_schedule(d)
+    return True
+
+def pass_turn(name, seen):
+    if st.session_state.quotas.get(name, 0) <= 0:
         return
-    for _ in range(len(st.session_state.selection_order)):
-        st.session_state.current_picker_idx = (
-            st.session_state.current_picker_idx + 1
-        ) % len(st.session_state.selection_order)
-        curr = st.session_state.selection_order[st.session_state.current_picker_idx]
-        if st.session_state.quotas.get(curr, 0) > 0:
-            return
-
-def pass_turn(name):
-    rem = st.session_state.quotas.get(name, 0)
-    if rem <= 0:
-        return
-    save_history()
-    others = [m for m in get_members() if m != name]
-    if others:
-        dist = [random.choice(others) for _ in range(rem)]
-        for t in dist:
-            st.session_state.quotas[t] += 1
-        summary_d = {x: dist.count(x) for x in set(dist)}
-        st.session_state.pass_log = f"🚫 **{name}** 패스 ➔ " + ", ".join(
-            [f"**{k}**(+{v}회)" for k, v in summary_d.items()]
-        )
-    st.session_state.quotas[name] = 0
+    if record({"op": "pass", "member": name}, seen):
+        st.session_state.undo_triggered = False
+
+# 버튼 콜백: rerun 맨 앞(sync_draft 전)에 실행되고, seen 은 버튼을 그릴 때의 이벤트 수
+def on_quota(names, seen):
+    record({"op": "quota", "members": names}, seen)
+
+def on_rank(names, seen):
+    if record({"op": "rank", "members": names}, seen):
+        st.session_state.undo_triggered = False
+        st.session_state.notice = ("success", "랜덤 순위 완료!")
+
+def on_manual_order(n_members, seen):
+    order = st.session_state.manual_order
+    if len(order) != n_members:
+        st.session_state.notice = ("error", f"{n_members}명 모두 선택해야 합니다. (현재 {len(order)}명)")
+    elif record({"op": "order", "order": list(order)}, seen):
+        st.session_state.undo_triggered = False
+        st.session_state.notice = ("success", "완료!")
+
+def on_undo(seen):
+    if st.session_state.undo_depth and record({"op": "undo"}, seen):
+        st.session_state.undo_triggered = True
+
+def on_pass(seen):
+    if st.session_state.selection_order:
+        pass_turn(st.session_state.selection_order[st.session_state.current_picker_idx], seen)
+
+def on_slot(slot_id, seen):
     st.session_state.undo_triggered = False
-    find_next_valid_picker()
-    st.rerun()
+    if st.session_state.manual_mode:
+        target = st.session_state.admin_selected_member
+    elif st.session_state.selection_order:
+        target = st.session_state.selection_order[st.session_state.current_picker_idx]
+    else:
+        target = None
+    if target and (st.session_state.quotas.get(target, 0) > 0 or st.session_state.manual_mode):
+        record({"op": "assign", "slot": slot_id, "member": target,
+                "manual": st.session_state.manual_mode}, seen)
 
 # --- 4. UI CSS ---
 st.set_page_config(page_title="CARE팀 당직 시스템", layout="wide")
@@ -161,29 +248,27 @@ with st.sidebar:
     sel_year = col_y.number_input("연도", 2025, 2030, today.year)
     sel_month = col_m.number_input("월", 1, 12, today.month)
 
+    # 선택한 달의 저장된 추첨(다른 세션의 기록 포함)을 시드 + 이벤트로 복구
+    sync_draft(sel_year, sel_month)
+
     if st.button("📅 달력 초기화 (새 달 시작)", use_container_width=True):
-        cal = calendar.monthcalendar(sel_year, sel_month)
-        h_days = set(get_holidays(sel_year, sel_month))
-        new_slots = []
-        slot_id = 0
-        for week in cal:
-            for c_idx, day in enumerate(week):
-                if day == 0:
-                    continue
-                is_h = (c_idx == 0 or c_idx == 6 or day in h_days)
-                if is_h:
-                    new_slots.append({"day": day, "type": "Day", "owner": None,
-                                      "id": slot_id, "is_heavy": True})
-                    slot_id += 1
-                new_slots.append({"day": day, "type": "Night", "owner": None,
-                                  "id": slot_id, "is_heavy": is_h})
-                slot_id += 1
-        st.session_state.update({
-            'slots': new_slots, 'quotas': {}, 'selection_order': [],
-            'current_picker_idx': 0, 'history': [], 'pass_log': "",
-            'quota_info': None, 'undo_triggered': False
-        })
-        st.rerun()
+        saved = storage.load_draft(sel_year, sel_month)
+        if saved and saved['events']:
+            st.session_state.confirm_reinit = True
+        else:
+            start_new_draft(sel_year, sel_month)
+    if st.session_state.confirm_reinit:
+        saved = storage.load_draft(sel_year, sel_month)
+        n_events = len(saved['events']) if saved else 0
+        st.warning(f"{sel_year}년 {sel_month}월에 진행 중인 추첨 기록({n_events}건)이 있습니다. "
+                   "초기화하면 모든 사용자의 기록이 새로 시작됩니다.")
+        ok_col, cancel_col = st.columns(2)
+        if ok_col.button("⚠️ 기록 지우고 초기화", use_container_width=True):
+            st.session_state.confirm_reinit = False
+            start_new_draft(sel_year, sel_month)
+        if cancel_col.button("취소", use_container_width=True):
+            st.session_state.confirm_reinit = False
+            st.rerun()
 
     st.divider()
     st.session_state.manual_mode = st.toggle("🛡️ 수동 모드 (순번 무시)")
@@ -245,36 +330,24 @@ col_info, col_cal = st.columns([1, 2.3])
 with col_info:
     st.subheader("🎲 추첨 및 순위 조정")
 
-    if st.button("🔢 1. 근무 횟수 추첨", use_container_width=True, disabled=(n_members == 0)):
-        t = len(st.session_state.slots)
-        b, e = divmod(t, n_members)
-        tmp = members.copy()
-        random.shuffle(tmp)
-        h, l = sorted(tmp[:e]), sorted(tmp[e:])
-        st.session_state.quotas = {n: b + 1 if n in h else b for n in members}
-        st.session_state.quota_info = (b + 1, h, b, l)
+    no_draft = st.session_state.draft is None
+    # 이 화면이 보여주는 draft 이벤트 수 (버튼 콜백에 넘겨 낡은 화면의 클릭을 걸러냄)
+    seen = 0 if no_draft else len(st.session_state.draft['events'])
+    st.button("🔢 1. 근무 횟수 추첨", use_container_width=True,
+              disabled=(n_members == 0 or no_draft),
+              on_click=on_quota, args=(list(members), seen))
 
     rank_col1, rank_col2 = st.columns(2)
-    if rank_col1.button("🏃 2-A. 랜덤 순위", use_container_width=True):
-        st.session_state.selection_order = random.sample(members, n_members)
-        st.session_state.current_picker_idx = 0
-        st.session_state.undo_triggered = False
-        st.success("랜덤 순위 완료!")
+    rank_col1.button("🏃 2-A. 랜덤 순위", use_container_width=True, disabled=no_draft,
+                     on_click=on_rank, args=(list(members), seen))
 
     with st.expander("🏃 2-B. 순위 수동 조정"):
-        manual_order = st.multiselect(
-            "순서대로 선택", members,
+        st.multiselect(
+            "순서대로 선택", members, key="manual_order",
             default=st.session_state.selection_order if st.session_state.selection_order else []
         )
-        if st.button("✅ 수동 순위 적용"):
-            if len(manual_order) == n_members:
-                st.session_state.selection_order = manual_order
-                st.session_state.current_picker_idx = 0
-                st.session_state.undo_triggered = False
-                st.success("완료!")
-                st.rerun()
-            else:
-                st.error(f"{n_members}명 모두 선택해야 합니다. (현재 {len(manual_order)}명)")
+        st.button("✅ 수동 순위 적용", disabled=no_draft,
+                  on_click=on_manual_order, args=(n_members, seen))
 
     if st.session_state.quota_info:
         b1, h1, b2, l2 = st.session_state.quota_info
@@ -282,30 +355,29 @@ with col_info:
 
     st.divider()
     ctrl1, ctrl2 = st.columns(2)
-    if ctrl1.button("↩️ 되돌리기", use_container_width=True,
-                    disabled=not st.session_state.history):
-        if st.session_state.history:
-            last = st.session_state.history.pop()
-            st.session_state.update({
-                'slots': last['slots'], 'quotas': last['quotas'],
-                'current_picker_idx': last['current_picker_idx'],
-                'pass_log': last['pass_log'], 'undo_triggered': True
-            })
+    ctrl1.button("↩️ 되돌리기", use_container_width=True,
+                 disabled=not st.session_state.undo_depth, on_click=on_undo, args=(seen,))
+    ctrl2.button("🚫 패스(배분)", use_container_width=True, on_click=on_pass, args=(seen,))
+
+    if st.session_state.notice:
+        kind, msg = st.session_state.notice
+        st.session_state.notice = None
+        getattr(st, kind)(msg)
+
+    if st.session_state.schedule_conflict == (sel_year, sel_month):
+        st.warning(f"다른 곳(웹 /api/schedule 등)에서 수정된 {sel_year}년 {sel_month}월 배정표는 덮어쓰지 않았습니다. "
+                   "추첨 기록은 계속 저장됩니다.")
+        if st.button("📤 현재 추첨 결과로 배정표 덮어쓰기", use_container_width=True):
+            storage.save_schedule(sel_year, sel_month, st.session_state.slots)
+            st.session_state.schedule_conflict = None
             st.rerun()
 
-    if ctrl2.button("🚫 패스(배분)", use_container_width=True):
-        if st.session_state.selection_order:
-            pass_turn(st.session_state.selection_order[st.session_state.current_picker_idx])
-
     if st.session_state.pass_log:
         st.warning(st.session_state.pass_log)
 
     st.subheader("📋 순위별 대기열")
     if st.session_state.selection_order:
-        curr_p = st.session_state.selection_order[st.session_state.current_picker_idx]
-        if st.session_state.quotas.get(curr_p, 0) <= 0:
-            find_next_valid_picker()
-
+        # 현재 순번 보정(잔여 0 → 다음 사람)은 draft 에서 이벤트마다 처리됨
         for idx, name in enumerate(st.session_state.selection_order):
             q = st.session_state.quotas.get(name, 0)
             if q <= 0:
@@ -339,13 +411,11 @@ with col_info:
                     else:
                         if rem_prefs:
                             target_id = int(rem_prefs[0])
-                            save_history()
-                            st.session_state.slots[target_id]['owner'] = name
-                            st.session_state.quotas[name] -= 1
-                            find_next_valid_picker()
-                            st.rerun()
+                            record({"op": "assign", "slot": target_id,
+                                    "member": name, "manual": False}, seen)
                         else:
-                            pass_turn(name)
+                            pass_turn(name, seen)
+                        st.rerun()
             else:
                 st.markdown(f"• {rank_label}{abs_tag} ({q}회){pref_txt}", unsafe_allow_html=True)
 
@@ -375,26 +445,8 @@ with col_cal:
                                 disabled=True, use_container_width=True
                             )
                         else:
-                            if st.button(slot_icon, key=f"b{s['id']}", use_container_width=True):
-                                save_history()
-                                st.session_state.undo_triggered = False
-                                if st.session_state.manual_mode:
-                                    target = st.session_state.admin_selected_member
-                                elif st.session_state.selection_order:
-                                    target = st.session_state.selection_order[
-                                        st.session_state.current_picker_idx
-                                    ]
-                                else:
-                                    target = None
-                                if target and (
-                                    st.session_state.quotas.get(target, 0) > 0
-                                    or st.session_state.manual_mode
-                                ):
-                                    s['owner'] = target
-                                    st.session_state.quotas[target] -= 1
-                                    if not st.session_state.manual_mode:
-                                        find_next_valid_picker()
-                                    st.rerun()
+                            st.button(slot_icon, key=f"b{s['id']}", use_container_width=True,
+                                      on_click=on_slot, args=(s['id'], seen))
 
 # --- 7. 당직 현황 요약표 ---
 if st.session_state.slots:
@@ -491,3 +543,21 @@ if st.session_state.slots:
         use_container_width=True,
         type="primary"
     )
+
+if st.session_state.draft is not None:
+    # zip 은 클릭할 때 만든다 (rerun 마다 연간 replay·zip 생성을 하지 않도록). 연·월은 슬롯과 같은 draft 기준
+    exp_year, exp_month = st.session_state.draft['year'], st.session_state.draft['month']
+    exp_slots = [dict(s) for s in st.session_state.slots]
+    exp_col1, exp_col2 = st.columns(2)
+    exp_col1.download_button(
+        "📆 이번 달 캘린더 내보내기 (ICS/CSV/JSON)",
+        data=partial(export.month_zip, exp_year, exp_month, exp_slots),
+        file_name=f"CARE팀_{exp_year}_{exp_month:02d}월_캘린더.zip",
+        mime="application/zip", on_click="ignore", use_container_width=True
+    )
+    exp_col2.download_button(
+        "🗂️ 연간 캘린더 내보내기 (ICS/CSV/JSON)",
+        data=partial(export.year_zip, exp_year, exp_month, exp_slots),
+        file_name=f"CARE팀_{exp_year}년_캘린더.zip",
+        mime="application/zip", on_click="ignore", use_container_width=True
+    )
@@ -0,0 +1,111 @@
+"""draft.replay() 결정성 점검.
+
+apply_event() 로 임의의 quota/rank/order/assign/pass/undo 이벤트를 적용한 실시간 상태와
+replay() 로 처음부터 재구성한 상태(슬롯·잔여 횟수·현재 순번 등)가 같은지 확인한다.
+_effective() 나 난수 키(seed:op:이벤트 번호)를 바꿨다면 배포 전에 실행할 것.
+
+사용:
+    python check_replay.py                 # 기본 20회 x 이벤트 1000개
+    python check_replay.py --runs 50 --events 5000
+"""
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+
+import draft
+
+COMPARE_KEYS = ('slots', 'members', 'quotas', 'selection_order', 'current_picker_idx',
+                'quota_info', 'pass_log', 'undo_depth')
+
+
+def _normalized(state):
+    out = {k: state[k] for k in COMPARE_KEYS}
+    out['quota_info'] = list(out['quota_info']) if out['quota_info'] else None
+    return out
+
+
+def check(live, d, label):
+    # 저장/복구 경로와 같게 JSON 왕복 후 replay
+    rebuilt = draft.replay(json.loads(json.dumps(d)))
+    a, b = _normalized(live), _normalized(rebuilt)
+    for k in COMPARE_KEYS:
+        if a[k] != b[k]:
+            raise AssertionError(f"{label}: '{k}' 불일치\n live:   {a[k]}\n replay: {b[k]}")
+
+
+def check_undo_pass():
+    """pass 를 되돌리면 pass 직전 상태로, 이후 pass 난수는 그대로인지"""
+    members = ["가", "나", "다", "라"]
+    d = draft.new_draft(2026, 3, [1, 2], seed=1234)
+    state = draft.replay(d)
+    for event in ({"op": "quota", "members": members}, {"op": "rank", "members": members}):
+        state = draft.apply_event(d, state, event)
+    before = copy.deepcopy(_normalized(state))
+
+    picker = state['selection_order'][state['current_picker_idx']]
+    state = draft.apply_event(d, state, {"op": "pass", "member": picker})
+    assert state['quotas'][picker] == 0
+    check(state, d, "pass")
+
+    state = draft.apply_event(d, state, {"op": "undo"})
+    after = _normalized(state)
+    for k in ('slots', 'quotas', 'selection_order', 'current_picker_idx'):
+        assert after[k] == before[k], f"pass undo: '{k}' 가 pass 이전으로 돌아가지 않음"
+    check(state, d, "pass undo")
+
+
+def random_events(d, state, rng, n_events):
+    members = [f"팀원{i:02d}" for i in range(rng.randint(2, 15))]
+    state = draft.apply_event(d, state, {"op": "quota", "members": members})
+    state = draft.apply_event(d, state, {"op": "rank", "members": members})
+    for _ in range(n_events):
+        r = rng.random()
+        free = [s['id'] for s in state['slots'] if s['owner'] is None]
+        order = state['selection_order']
+        picker = order[state['current_picker_idx']]
+        if r < 0.5 and free:
+            manual = rng.random() < 0.1
+            name = rng.choice(members) if manual else picker
+            event = {"op": "assign", "slot": rng.choice(free), "member": name, "manual": manual}
+        elif r < 0.65:
+            if state['quotas'].get(picker, 0) <= 0:
+                continue
+            event = {"op": "pass", "member": picker}
+        elif r < 0.97:
+            event = {"op": "undo"}
+        elif r < 0.99:
+            event = {"op": "rank", "members": members}
+        else:
+            event = {"op": "order", "order": rng.sample(members, len(members))}
+        state = draft.apply_event(d, state, event)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="draft.replay() 결정성 점검")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    check_undo_pass()
+
+    rng = random.Random(args.seed)
+    slowest = 0.0
+    for run in range(args.runs):
+        d = draft.new_draft(2026, rng.randint(1, 12), rng.sample(range(1, 29), 2), seed=rng.getrandbits(32))
+        state = random_events(d, draft.replay(d), rng, args.events)
+        check(state, d, f"run {run} (seed {d['seed']})")
+        t = time.perf_counter()
+        draft.replay(d)
+        slowest = max(slowest, time.perf_counter() - t)
+
+    print(f"OK: {args.runs}회 x 이벤트 ~{args.events}개, replay 최대 {slowest * 1000:.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""시드 + 이벤트 목록으로 재현 가능한 월별 당직 추첨.
+
+draft = {"year", "month", "holidays", "seed", "events": [...]}
+
+이벤트 (op):
+  quota  {"members": [...]}          근무 횟수 추첨
+  rank   {"members": [...]}          랜덤 순위
+  order  {"order": [...]}            수동 순위
+  assign {"slot", "member", "manual"}
+  pass   {"member"}                  잔여 횟수를 다른 팀원에게 랜덤 배분
+  undo   {}                          마지막 assign/pass 취소
+
+모든 난수는 random.Random(f"{seed}:{op}:{이벤트 번호}") 에서 나오므로,
+같은 draft 를 replay() 하면 슬롯·잔여 횟수·현재 순번이 항상 같게 재구성된다.
+이벤트 번호는 취소된 이벤트를 포함한 전체 목록 기준이라 undo 가 이후 난수를 바꾸지 않는다.
+"""
+import calendar
+import random
+
+UNDOABLE = ("assign", "pass")
+
+
+def generate_slots(year, month, holiday_days):
+    """일요일/토요일/공휴일은 주간+야간, 평일은 야간만"""
+    h_days = set(holiday_days)
+    slots = []
+    slot_id = 0
+    for week in calendar.Calendar(calendar.SUNDAY).monthdayscalendar(year, month):
+        for c_idx, day in enumerate(week):
+            if day == 0:
+                continue
+            is_h = (c_idx == 0 or c_idx == 6 or day in h_days)
+            if is_h:
+                slots.append({"day": day, "type": "Day", "owner": None,
+                              "id": slot_id, "is_heavy": True})
+                slot_id += 1
+            slots.append({"day": day, "type": "Night", "owner": None,
+                          "id": slot_id, "is_heavy": is_h})
+            slot_id += 1
+    return slots
+
+
+def new_draft(year, month, holiday_days, seed=None):
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+    return {"year": year, "month": month, "holidays": sorted(holiday_days),
+            "seed": seed, "events": []}
+
+
+def _rng(seed, op, n):
+    return random.Random(f"{seed}:{op}:{n}")
+
+
+def _empty_state(draft):
+    return {
+        'slots': generate_slots(draft['year'], draft['month'], draft['holidays']),
+        'members': [], 'quotas': {}, 'selection_order': [], 'current_picker_idx': 0,
+        'quota_info': None, 'pass_log': "", 'undo_depth': 0,
+    }
+
+
+def _find_next_valid_picker(state):
+    order = state['selection_order']
+    if not order:
+        return
+    for _ in range(len(order)):
+        state['current_picker_idx'] = (state['current_picker_idx'] + 1) % len(order)
+        if state['quotas'].get(order[state['current_picker_idx']], 0) > 0:
+            return
+
+
+def _normalize_picker(state):
+    # 화면 렌더링 시 '현재 순번의 잔여 횟수가 0이면 다음 사람' 처리와 동일
+    order = state['selection_order']
+    if order and state['quotas'].get(order[state['current_picker_idx']], 0) <= 0:
+        _find_next_valid_picker(state)
+
+
+def _apply(state, event, n, seed):
+    op = event['op']
+    if op == "quota":
+        members = list(event['members'])
+        b, e = divmod(len(state['slots']), len(members))
+        tmp = members.copy()
+        _rng(seed, op, n).shuffle(tmp)
+        h, l = sorted(tmp[:e]), sorted(tmp[e:])
+        state['members'] = members
+        state['quotas'] = {m: b + 1 if m in h else b for m in members}
+        state['quota_info'] = (b + 1, h, b, l)
+    elif op == "rank":
+        members = list(event['members'])
+        state['selection_order'] = _rng(seed, op, n).sample(members, len(members))
+        state['current_picker_idx'] = 0
+    elif op == "order":
+        state['selection_order'] = list(event['order'])
+        state['current_picker_idx'] = 0
+    elif op == "assign":
+        name = event['member']
+        state['slots'][event['slot']]['owner'] = name
+        state['quotas'][name] = state['quotas'].get(name, 0) - 1
+        if not event.get('manual'):
+            _find_next_valid_picker(state)
+        state['undo_depth'] += 1
+    elif op == "pass":
+        name = event['member']
+        rem = state['quotas'].get(name, 0)
+        others = [m for m in state['members'] if m != name]
+        if others:
+            rng = _rng(seed, op, n)
+            dist = [rng.choice(others) for _ in range(rem)]
+            summary_d = {}
+            for t in dist:
+                state['quotas'][t] = state['quotas'].get(t, 0) + 1
+                summary_d[t] = summary_d.get(t, 0) + 1
+            state['pass_log'] = f"🚫 **{name}** 패스 ➔ " + ", ".join(
+                [f"**{k}**(+{v}회)" for k, v in summary_d.items()]
+            )
+        state['quotas'][name] = 0
+        _find_next_valid_picker(state)
+        state['undo_depth'] += 1
+    else:
+        raise ValueError(f"알 수 없는 이벤트: {op}")
+    _normalize_picker(state)
+
+
+def _effective(events):
+    """undo 로 취소된 assign/pass 를 제거한 (이벤트 번호, 이벤트) 목록"""
+    out = []
+    stack = []
+    for n, event in enumerate(events):
+        if event['op'] == "undo":
+            if stack:
+                out[stack.pop()] = None
+            continue
+        if event['op'] in UNDOABLE:
+            stack.append(len(out))
+        out.append((n, event))
+    return [x for x in out if x is not None]
+
+
+def replay(draft):
+    """draft 의 시드와 이벤트로 상태를 처음부터 재구성"""
+    state = _empty_state(draft)
+    for n, event in _effective(draft['events']):
+        _apply(state, event, n, draft['seed'])
+    return state
+
+
+def apply_event(draft, state, event):
+    """이벤트를 draft 에 추가하고 state 를 갱신 (undo 는 전체 replay)"""
+    draft['events'].append(event)
+    if event['op'] == "undo":
+        return replay(draft)
+    _apply(state, event, len(draft['events']) - 1, draft['seed'])
+    return state
@@ -0,0 +1,214 @@
+"""팀원별 .ics / 팀 CSV / JSON 피드를 하나의 zip 으로 내보내기.
+
+- 슬롯을 한 번 훑어 팀원별 인덱스(owner_index)를 만들고,
+  인덱스를 한 번 순회하면서 ics 는 zip 항목에 바로 쓰고 CSV/JSON 은 임시 파일에 이어 쓴다.
+- 결과는 스케줄 버전(배정 내용 해시)별로 캐시되어 같은 내용의 재다운로드는 다시 만들지 않는다.
+- 앱은 month_zip / year_zip 을 다운로드 버튼의 지연 생성(data=callable)으로 넘겨 클릭할 때만 만든다.
+"""
+import csv
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+import draft
+import storage
+
+# 근무 시간 (시작 시, 종료 시) — 야간은 다음 날 종료
+SHIFT_TIMES = {"Day": (9, 18), "Night": (18, 9)}
+SHIFT_LABELS = {"Day": "주간", "Night": "야간"}
+TZID = "Asia/Seoul"
+# RFC 5545 §3.2.19: 참조하는 TZID 마다 VTIMEZONE 필요 (한국은 +0900, 서머타임 없음)
+VTIMEZONE = (
+    "BEGIN:VTIMEZONE\r\n"
+    f"TZID:{TZID}\r\n"
+    "BEGIN:STANDARD\r\n"
+    "DTSTART:19700101T000000\r\n"
+    "TZOFFSETFROM:+0900\r\n"
+    "TZOFFSETTO:+0900\r\n"
+    "TZNAME:KST\r\n"
+    "END:STANDARD\r\n"
+    "END:VTIMEZONE\r\n"
+)
+CACHE_SIZE = 8
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+# --- 입력 ---
+def load_month(year, month):
+    """저장된 추첨(draft) 이 있으면 replay, 없으면 schedule_YYYY_MM.json 의 슬롯"""
+    saved = storage.load_draft(year, month)
+    if saved:
+        return draft.replay(saved)['slots']
+    return storage.load_schedule(year, month) or []
+
+
+def load_year(year):
+    return [(year, m, load_month(year, m)) for m in range(1, 13)]
+
+
+def schedule_version(schedules):
+    """배정 내용만으로 계산한 버전 (같은 배정이면 같은 값)"""
+    h = hashlib.sha1()
+    for year, month, slots in schedules:
+        h.update(f"{year}-{month}:".encode())
+        for s in slots:
+            if s['owner']:
+                h.update(f"{s['id']}={s['owner']};".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def owner_index(schedules):
+    """{이름: [(year, month, slot), ...]} — 슬롯 목록을 한 번만 순회"""
+    index = {}
+    for year, month, slots in schedules:
+        for s in slots:
+            if s['owner']:
+                index.setdefault(s['owner'], []).append((year, month, s))
+    return index
+
+
+# --- 포맷 ---
+def _shift_range(year, month, s):
+    start_h, end_h = SHIFT_TIMES[s['type']]
+    start = datetime(year, month, s['day'], start_h)
+    end = datetime(year, month, s['day'], end_h)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def _ics_text(value):
+    """TEXT 값 이스케이프 (RFC 5545 §3.3.11)"""
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "\\n"))
+
+
+def _ics_line(line):
+    """75 옥텟 단위로 접기 (§3.1). UTF-8 문자 중간에서 자르지 않는다."""
+    data = line.encode('utf-8')
+    parts = []
+    limit = 75
+    while len(data) > limit:
+        cut = limit
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+        limit = 74  # 다음 줄은 앞의 공백 1옥텟 포함
+    parts.append(data)
+    return "\r\n ".join(p.decode('utf-8') for p in parts) + "\r\n"
+
+
+def _ics_event(year, month, s, name, stamp):
+    start, end = _shift_range(year, month, s)
+    summary = _ics_text(f"CARE팀 {SHIFT_LABELS[s['type']]} 당직 ({name})")
+    return "".join(_ics_line(x) for x in (
+        "BEGIN:VEVENT",
+        f"UID:{year}{month:02d}-{s['id']}@care-team-duty",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART;TZID={TZID}:{start:%Y%m%dT%H%M%S}",
+        f"DTEND;TZID={TZID}:{end:%Y%m%dT%H%M%S}",
+        f"SUMMARY:{summary}",
+        "END:VEVENT",
+    ))
+
+
+def _safe_name(name):
+    return "".join(c if c.isalnum() or c in "-_ " else "_" for c in name).strip() or "member"
+
+
+# --- zip 생성 ---
+def write_zip(fileobj, schedules):
+    """schedules = [(year, month, slots), ...] 를 fileobj 에 zip 으로 기록"""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    index = owner_index(schedules)
+
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf, \
+            tempfile.SpooledTemporaryFile(max_size=1 << 20, mode='w+', encoding='utf-8', newline='') as csv_buf, \
+            tempfile.SpooledTemporaryFile(max_size=1 << 20, mode='w+', encoding='utf-8') as json_buf:
+        writer = csv.writer(csv_buf)
+        writer.writerow(["이름", "날짜", "구분", "슬롯ID"])
+        json_buf.write("[")
+        first = True
+
+        used = set()
+        for name in sorted(index):
+            entries = sorted(index[name], key=lambda e: (e[0], e[1], e[2]['day'], e[2]['id']))
+            # 서로 다른 이름이 같은 파일명이 되면 (예: a.b / a,b) 번호를 붙여 구분
+            base = arc_name = _safe_name(name)
+            n = 2
+            while arc_name.casefold() in used:
+                arc_name = f"{base}_{n}"
+                n += 1
+            used.add(arc_name.casefold())
+            with zf.open(f"ics/{arc_name}.ics", 'w') as raw:
+                ics = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                ics.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+                          "PRODID:-//CARE Team//Duty Export//KO\r\nCALSCALE:GREGORIAN\r\n"
+                          + _ics_line(f"X-WR-CALNAME:{_ics_text(f'CARE팀 당직 - {name}')}")
+                          + VTIMEZONE)
+                for year, month, s in entries:
+                    ics.write(_ics_event(year, month, s, name, stamp))
+                    day = date(year, month, s['day']).isoformat()
+                    writer.writerow([name, day, SHIFT_LABELS[s['type']], s['id']])
+                    json_buf.write(("" if first else ",") + json.dumps(
+                        {"name": name, "date": day, "type": s['type'], "slot": s['id']},
+                        ensure_ascii=False))
+                    first = False
+                ics.write("END:VCALENDAR\r\n")
+                ics.flush()
+                ics.detach()
+
+        json_buf.write("]")
+        for arc_name, buf, enc in (("team.csv", csv_buf, 'utf-8-sig'), ("feed.json", json_buf, 'utf-8')):
+            buf.seek(0)
+            with zf.open(arc_name, 'w') as raw:
+                out = io.TextIOWrapper(raw, encoding=enc, newline='')
+                shutil.copyfileobj(buf, out)
+                out.flush()
+                out.detach()
+
+
+def clear_cache():
+    """zip 캐시 비우기 (부하 테스트에서 캐시 없는 내보내기를 잴 때)"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def export_zip(schedules):
+    """zip bytes (스케줄 버전별 캐시)"""
+    schedules = list(schedules)
+    version = schedule_version(schedules)
+    with _cache_lock:
+        if version in _cache:
+            _cache.move_to_end(version)
+            return _cache[version]
+
+    buf = io.BytesIO()
+    write_zip(buf, schedules)
+    data = buf.getvalue()
+
+    with _cache_lock:
+        _cache[version] = data
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
+
+
+def month_zip(year, month, slots):
+    """이번 달 zip (다운로드 버튼이 클릭 시점에 호출)"""
+    return export_zip([(year, month, slots)])
+
+
+def year_zip(year, month, slots):
+    """연간 zip. month 는 화면의 slots 로, 나머지 달은 저장된 draft / 배정표로 채운다."""
+    return export_zip([(y, m, slots if m == month else month_slots)
+                       for y, m, month_slots in load_year(year)])
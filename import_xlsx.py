@@ -0,0 +1,145 @@
+"""make_excel() 로 만든 과거 당직표(xlsx)를 읽어 슬롯/배정/팀원별 합계를 복원.
+
+- openpyxl read_only 모드로 시트를 행 단위 스트리밍 (필요한 시트만 연다)
+- 여러 파일은 ProcessPoolExecutor 로 병렬 처리
+
+사용:
+    python import_xlsx.py 당직표/*.xlsx            # 팀원별 누적 합계 출력
+    python import_xlsx.py 당직표/*.xlsx --save     # DATA_DIR/schedule_YYYY_MM.json 으로 저장
+"""
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import load_workbook
+
+import draft
+import storage
+
+SUMMARY_SHEET = "현황요약"
+HOLIDAY_FILL = "FFC9C9"  # make_excel() 의 일요일/공휴일 배경색
+
+TITLE_YM = re.compile(r"(\d{4})\.(\d{1,2})월")
+TITLE_M = re.compile(r"(\d{1,2})월")
+FILE_YM = re.compile(r"(\d{4})_(\d{1,2})월")
+CELL_DAY = re.compile(r"\[(\d{1,2})일\]")
+CELL_OWNER = re.compile(r"^(주|야):[ \t]*(.*?)\s*$", re.M)
+
+
+def _year_month(title, path, default_year):
+    m = TITLE_YM.search(title) or FILE_YM.search(os.path.basename(path))
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    m = TITLE_M.search(title)
+    if m and default_year:
+        return default_year, int(m.group(1))
+    raise ValueError(f"{path}: 연/월을 알 수 없습니다 (시트 이름 '{title}')")
+
+
+def _is_holiday_fill(cell):
+    color = getattr(getattr(cell, 'fill', None), 'fgColor', None)
+    rgb = getattr(color, 'rgb', None)
+    return isinstance(rgb, str) and rgb.upper().endswith(HOLIDAY_FILL)
+
+
+def parse_file(path, default_year=None):
+    """xlsx 한 개 → {"year", "month", "slots", "totals", "source"}"""
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        year, month = _year_month(ws.title, path, default_year)
+
+        owners = {}    # day -> {"Day": name, "Night": name}
+        holidays = []
+        for row in ws.iter_rows(min_row=2):
+            for c_idx, cell in enumerate(row[:7]):
+                text = cell.value
+                if not isinstance(text, str):
+                    continue
+                m = CELL_DAY.search(text)
+                if not m:
+                    continue
+                day = int(m.group(1))
+                kinds = {"주": "Day", "야": "Night"}
+                owners[day] = {kinds[k]: name for k, name in CELL_OWNER.findall(text) if name}
+                if 0 < c_idx < 6 and _is_holiday_fill(cell):
+                    holidays.append(day)
+
+        # 공휴일 배경이 없는 파일(app.py 형식 등)은 주간 배정이 있는 평일을 공휴일로 간주
+        holidays.extend(d for d, o in owners.items() if "Day" in o and d not in holidays)
+        slots = draft.generate_slots(year, month, holidays)
+        for s in slots:
+            s['owner'] = owners.get(s['day'], {}).get(s['type'])
+
+        totals = {}
+        if SUMMARY_SHEET in wb.sheetnames:
+            for row in wb[SUMMARY_SHEET].iter_rows(min_row=2, values_only=True):
+                if row and row[0]:
+                    totals[str(row[0])] = {"주간": int(row[1] or 0), "야간": int(row[2] or 0)}
+        else:
+            for s in slots:
+                if s['owner']:
+                    v = totals.setdefault(s['owner'], {"주간": 0, "야간": 0})
+                    v["주간" if s['type'] == 'Day' else "야간"] += 1
+    finally:
+        wb.close()
+    return {"year": year, "month": month, "slots": slots, "totals": totals, "source": path}
+
+
+def _parse_args(args):
+    return parse_file(*args)
+
+
+def import_files(paths, default_year=None, workers=None):
+    """여러 파일을 병렬로 파싱 (연/월 순 정렬)"""
+    jobs = [(p, default_year) for p in paths]
+    if len(jobs) < 2 or workers == 1:
+        results = [parse_file(*j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_parse_args, jobs, chunksize=max(1, len(jobs) // 32)))
+    return sorted(results, key=lambda r: (r['year'], r['month']))
+
+
+def member_history(results):
+    """팀원별 누적 합계 {이름: {"주간", "야간", "합계", "개월"}}"""
+    hist = {}
+    for r in results:
+        for name, v in r['totals'].items():
+            h = hist.setdefault(name, {"주간": 0, "야간": 0, "합계": 0, "개월": 0})
+            h["주간"] += v["주간"]
+            h["야간"] += v["야간"]
+            h["합계"] += v["주간"] + v["야간"]
+            h["개월"] += 1
+    return hist
+
+
+def save_results(results):
+    for r in results:
+        storage.save_schedule(r['year'], r['month'], r['slots'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="과거 당직표(xlsx) 가져오기")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--year", type=int, help="시트/파일 이름에 연도가 없을 때 사용할 연도")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--save", action="store_true", help="DATA_DIR 에 schedule_YYYY_MM.json 저장")
+    args = parser.parse_args(argv)
+
+    results = import_files(args.files, args.year, args.workers)
+    if args.save:
+        save_results(results)
+    for r in results:
+        assigned = sum(1 for s in r['slots'] if s['owner'])
+        print(f"{r['year']}.{r['month']:02d}  {assigned}/{len(r['slots'])}  {r['source']}")
+    print()
+    for name, h in sorted(member_history(results).items(), key=lambda x: -x[1]["합계"]):
+        print(f"{name}\t주간 {h['주간']}\t야간 {h['야간']}\t합계 {h['합계']}\t({h['개월']}개월)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
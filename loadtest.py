@@ -0,0 +1,328 @@
+"""care-duty.py 동시 세션 부하 테스트 (Streamlit AppTest).
+
+Streamlit 서버는 컨테이너 하나에서 모든 세션의 rerun 을 한 프로세스(하나의 GIL)의 스레드로 돌린다.
+여기서도 세션 N개를 한 프로세스 안의 스레드로 동시에 실행하므로, rerun 이 서로 뒤에 줄을 서는
+대기 시간이 지연시간에 포함되고 처리량은 컨테이너 하나의 용량이 된다.
+(--processes 로 여러 프로세스에 나눌 수 있지만, 그때의 처리량은 컨테이너 하나의 용량이 아니다.)
+
+모든 세션은 실제 서버처럼 DATA_DIR 하나를 공유한다.
+- 기본: 세션마다 다른 연·월을 골라 각자 독립된 draft 를 진행 (72개 이후로는 달이 겹친다)
+- --shared-draft: 모든 세션이 같은 달 draft 에 기록해 draft 파일 잠금·append·충돌 경로를 잰다
+
+스텝 종류: click(빈 슬롯 배정) / pass / undo → rerun 지연시간
+          export(캐시를 비우고 다운로드 버튼이 호출하는 export.month_zip / year_zip) → 내보내기 지연시간 (별도 집계)
+초기 설정(첫 실행·연월 선택·달력 초기화·추첨·순위) 지연시간도 별도로 집계하며 --max-p95-ms 게이트에는 넣지 않는다.
+
+사용:
+    python loadtest.py --sessions 40 --steps 30
+    python loadtest.py --sessions 20 --shared-draft
+    python loadtest.py --sessions 40 --max-p95-ms 300 --max-rss-mb 5   # 배포 전 회귀 게이트
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "care-duty.py")
+CONFLICT_TEXT = "다른 사용자가 먼저 변경"
+
+SCRIPTS = {
+    "draft": {"click": 0.85, "pass": 0.05, "undo": 0.05, "export": 0.05},
+    "mixed": {"click": 0.55, "pass": 0.1, "undo": 0.15, "export": 0.2},
+    "export": {"click": 0.3, "pass": 0.0, "undo": 0.0, "export": 0.7},
+}
+
+
+def rss_mb():
+    """현재 프로세스 RSS (MB)"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _share_apptest_runtime():
+    """AppTest 를 여러 스레드에서 동시에 돌릴 수 있게 한다 (부하 테스트 전용).
+
+    AppTest.run() 은 실행마다 전역 Runtime 인스턴스를 만들었다가 None 으로 되돌리고, 스크립트도
+    새 ScriptCache 로 다시 컴파일한다. 동시에 돌리면 다른 세션의 실행이 깨지므로
+    실제 서버처럼 Runtime·ScriptCache 하나를 모든 세션이 공유하게 바꾼다.
+    """
+    from streamlit import config
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    if getattr(Runtime, "_loadtest_shared", False):
+        return
+    config.set_option("global.appTest", True)
+    real_instance = Runtime.instance.__func__
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+        return last[0] if last else real_instance(cls)
+
+    Runtime.instance = classmethod(instance)
+    cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+    Runtime._loadtest_shared = True
+
+
+def _button(at, prefix):
+    for b in at.button:
+        if b.label.startswith(prefix) and not b.disabled:
+            return b
+    return None
+
+
+def _number_input(at, label):
+    return next(w for w in at.number_input if w.label == label)
+
+
+def _free_slots(at):
+    return [b for b in at.button if b.key and b.key.startswith("b") and not b.disabled]
+
+
+def session_month(sid):
+    """세션별 연·월 (사이드바 범위 2025~2030 안에서 72개)"""
+    return 2025 + (sid // 12) % 6, sid % 12 + 1
+
+
+class Session:
+    def __init__(self, sid, timeout, month=None):
+        from streamlit.testing.v1 import AppTest
+        self.sid = sid
+        self.month = month
+        self.rng = random.Random(sid)
+        self.at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+        self.latencies = []
+        self.setup_latencies = []
+        self.export_latencies = []
+        self.errors = 0
+        self.conflicts = 0
+
+    def _run(self, widget=None, bucket=None):
+        """widget 은 click()/set_value() 까지 한 위젯 (None 이면 그냥 rerun)"""
+        t = time.perf_counter()
+        (self.at if widget is None else widget).run()
+        (self.latencies if bucket is None else bucket).append(time.perf_counter() - t)
+        if self.at.exception:
+            self.errors += 1
+        if any(CONFLICT_TEXT in w.value for w in self.at.warning):
+            self.conflicts += 1
+
+    def setup(self, init=True):
+        self._run(bucket=self.setup_latencies)
+        if self.month is not None:
+            year, month = self.month
+            self._run(_number_input(self.at, "연도").set_value(year), bucket=self.setup_latencies)
+            self._run(_number_input(self.at, "월").set_value(month), bucket=self.setup_latencies)
+        if init:
+            for prefix in ("📅", "🔢", "🏃 2-A"):
+                b = _button(self.at, prefix)
+                if b is not None:
+                    self._run(b.click(), bucket=self.setup_latencies)
+
+    def export(self):
+        """다운로드 버튼의 지연 생성 함수(export.month_zip / year_zip)를 캐시 없이 실행"""
+        import export
+        d = self.at.session_state.draft
+        if d is None:
+            return
+        slots = [dict(s) for s in self.at.session_state.slots]
+        export.clear_cache()
+        t = time.perf_counter()
+        export.month_zip(d['year'], d['month'], slots)
+        export.year_zip(d['year'], d['month'], slots)
+        self.export_latencies.append(time.perf_counter() - t)
+
+    def step(self, weights):
+        action = self.rng.choices(list(weights), list(weights.values()))[0]
+        if action == "export":
+            self.export()
+            return
+        widget = None
+        if action == "click":
+            free = _free_slots(self.at)
+            widget = self.rng.choice(free) if free else None
+        elif action == "pass":
+            widget = _button(self.at, "🚫")
+        elif action == "undo":
+            widget = _button(self.at, "↩️")
+        self._run(None if widget is None else widget.click())
+
+
+def run_sessions(session_ids, steps, script, timeout, data_dir, shared_draft):
+    """한 프로세스 안에서 세션들을 스레드로 동시에 실행하고 지연시간/RSS 를 반환"""
+    _share_apptest_runtime()
+    os.environ["DATA_DIR"] = data_dir
+    import audit_log
+    import storage
+    weights = SCRIPTS[script]
+
+    # streamlit/앱 모듈 import 비용을 세션별 RSS 에서 제외하기 위한 워밍업 (별도 DATA_DIR)
+    with tempfile.TemporaryDirectory(prefix="care-duty-warmup-") as warm_dir:
+        storage.DATA_DIR = warm_dir
+        warm = Session(-1, timeout)
+        warm.setup()
+        warm.export()
+        audit_log.flush()
+        del warm
+    storage.DATA_DIR = data_dir
+
+    rss_start = rss_mb()
+    sessions = [Session(sid, timeout, None if shared_draft else session_month(sid))
+                for sid in session_ids]
+    failures = []
+    t0 = time.perf_counter()
+    # 공유 draft 는 한 세션(0번)만 달력 초기화·추첨·순위를 하고 나머지는 그 draft 에 합류
+    leader = sessions[0] if shared_draft and sessions and sessions[0].sid == 0 else None
+    if leader is not None:
+        leader.setup()
+    start = threading.Barrier(len(sessions))
+
+    def loop(s):
+        try:
+            start.wait()
+            if s is not leader:
+                s.setup(init=not shared_draft)
+            for _ in range(steps):
+                s.step(weights)
+        except Exception:
+            s.errors += 1
+            failures.append(traceback.format_exc())
+
+    threads = [threading.Thread(target=loop, args=(s,), name=f"session-{s.sid}") for s in sessions]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - t0
+    rss_end = rss_mb()
+
+    audit_log.flush()
+    if failures:
+        print(failures[0], file=sys.stderr)
+    return {
+        "latencies": [x for s in sessions for x in s.latencies],
+        "setup_latencies": [x for s in sessions for x in s.setup_latencies],
+        "export_latencies": [x for s in sessions for x in s.export_latencies],
+        "errors": sum(s.errors for s in sessions),
+        "conflicts": sum(s.conflicts for s in sessions),
+        "elapsed": elapsed,
+        "sessions": len(sessions),
+        "rss_start": rss_start,
+        "rss_end": rss_end,
+    }
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def run(sessions, steps, script, timeout=30, data_dir=None, processes=1, shared_draft=False):
+    if data_dir is None:
+        with tempfile.TemporaryDirectory(prefix="care-duty-load-") as tmp:
+            return run(sessions, steps, script, timeout, tmp, processes, shared_draft)
+
+    processes = max(1, min(processes, sessions))
+    t0 = time.perf_counter()
+    if processes == 1:
+        results = [run_sessions(list(range(sessions)), steps, script, timeout, data_dir, shared_draft)]
+    else:
+        shards = [list(range(w, sessions, processes)) for w in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(run_sessions, ids, steps, script, timeout, data_dir, shared_draft)
+                       for ids in shards]
+            results = [f.result() for f in futures]
+    wall = time.perf_counter() - t0
+
+    latencies = [x for r in results for x in r["latencies"]]
+    setup = [x for r in results for x in r["setup_latencies"]]
+    exports = [x for r in results for x in r["export_latencies"]]
+    rss_growth = [(r["rss_end"] - r["rss_start"]) / r["sessions"] for r in results if r["sessions"]]
+    busy = max(r["elapsed"] for r in results)
+    return {
+        "sessions": sessions, "processes": processes, "steps": steps, "script": script,
+        "shared_draft": shared_draft,
+        "reruns": len(latencies) + len(setup),
+        "errors": sum(r["errors"] for r in results),
+        "conflicts": sum(r["conflicts"] for r in results),
+        "throughput": (len(latencies) + len(setup)) / busy if busy else 0.0,
+        "wall": wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "setup_p50_ms": percentile(setup, 50) * 1000,
+        "setup_p95_ms": percentile(setup, 95) * 1000,
+        "exports": len(exports),
+        "export_p50_ms": percentile(exports, 50) * 1000,
+        "export_p95_ms": percentile(exports, 95) * 1000,
+        "rss_per_session_mb": sum(rss_growth) / len(rss_growth) if rss_growth else 0.0,
+        "rss_end_mb": max(r["rss_end"] for r in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="care-duty.py 동시 세션 부하 테스트")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=20, help="세션당 스텝 수 (초기 설정 제외)")
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="mixed")
+    parser.add_argument("--timeout", type=float, default=60, help="rerun 1회 타임아웃(초)")
+    parser.add_argument("--data-dir", help="모든 세션이 공유할 DATA_DIR (기본: 임시 디렉토리)")
+    parser.add_argument("--shared-draft", action="store_true",
+                        help="모든 세션이 같은 달 draft 에 기록 (잠금·충돌 경로 측정)")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="세션을 여러 프로세스에 나눔 (처리량이 컨테이너 1개 용량이 아니게 됨)")
+    parser.add_argument("--max-p95-ms", type=float, help="rerun p95 지연시간 상한 (초과 시 exit 1)")
+    parser.add_argument("--max-export-p95-ms", type=float, help="내보내기 p95 상한 (초과 시 exit 1)")
+    parser.add_argument("--max-rss-mb", type=float, help="세션당 RSS 증가 상한 (초과 시 exit 1)")
+    args = parser.parse_args(argv)
+
+    r = run(args.sessions, args.steps, args.script, args.timeout, args.data_dir,
+            args.processes, args.shared_draft)
+    mode = "같은 달 draft 공유" if r['shared_draft'] else "세션별 다른 달"
+    print(f"세션 {r['sessions']}개 / 프로세스 {r['processes']}개 / {mode} / 스크립트 {r['script']} / 스텝 {r['steps']}")
+    scope = "컨테이너 1개 기준" if r['processes'] == 1 else f"프로세스 {r['processes']}개 합산, 컨테이너 1개 용량 아님"
+    print(f"rerun {r['reruns']}회, 오류 {r['errors']}회, 처리량 {r['throughput']:.1f} rerun/s ({scope}) "
+          f"(총 {r['wall']:.1f}s)")
+    print(f"rerun 지연시간 p50 {r['p50_ms']:.0f}ms / p95 {r['p95_ms']:.0f}ms / "
+          f"p99 {r['p99_ms']:.0f}ms / max {r['max_ms']:.0f}ms")
+    print(f"초기 설정 p50 {r['setup_p50_ms']:.0f}ms / p95 {r['setup_p95_ms']:.0f}ms")
+    print(f"내보내기 {r['exports']}회 p50 {r['export_p50_ms']:.0f}ms / p95 {r['export_p95_ms']:.0f}ms")
+    print(f"draft 충돌(다른 세션이 먼저 기록) {r['conflicts']}회")
+    print(f"세션당 RSS 증가 {r['rss_per_session_mb']:.2f}MB (최대 RSS {r['rss_end_mb']:.0f}MB)")
+
+    failed = r['errors'] > 0
+    if args.max_p95_ms is not None and r['p95_ms'] > args.max_p95_ms:
+        print(f"FAIL: p95 {r['p95_ms']:.0f}ms > {args.max_p95_ms:.0f}ms")
+        failed = True
+    if args.max_export_p95_ms is not None and r['export_p95_ms'] > args.max_export_p95_ms:
+        print(f"FAIL: 내보내기 p95 {r['export_p95_ms']:.0f}ms > {args.max_export_p95_ms:.0f}ms")
+        failed = True
+    if args.max_rss_mb is not None and r['rss_per_session_mb'] > args.max_rss_mb:
+        print(f"FAIL: 세션당 RSS {r['rss_per_session_mb']:.2f}MB > {args.max_rss_mb:.2f}MB")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
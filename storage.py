@@ -0,0 +1,277 @@
+"""Next.js(lib/storage.ts)와 같은 DATA_DIR 포맷을 읽고 쓰는 파일 저장소.
+
+- members.json, schedule_YYYY_MM.json 을 그대로 공유한다.
+  schedule 은 draft 에서 게시하되, Next.js 등 다른 writer 가 고친 파일은 덮어쓰지 않는다 (save_schedule).
+- draft_YYYY_MM.jsonl (Python 전용): 첫 줄 헤더 + 이벤트 한 줄씩, 이벤트는 append 만 한다.
+- 읽기: (mtime, size) 가 바뀌지 않은 파일은 다시 파싱하지 않는다.
+- 쓰기: 파일 잠금 + 임시 파일 → os.replace 로 원자적 교체, 내용이 같으면 쓰지 않는다.
+
+잠금(.<filename>.lock)은 이 모듈을 쓰는 Python 프로세스끼리만 유효하다.
+lib/storage.ts 는 잠금 없이 writeFileSync 로 덮어쓰므로 Next.js 와의 쓰기는 직렬화되지 않는다.
+"""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+    FCNTL = True
+except ImportError:  # Windows 개발 환경
+    FCNTL = False
+
+DATA_DIR = os.environ.get(
+    "DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+)
+
+# 전체 경로 -> (mtime_ns, size, parsed)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def data_path(filename):
+    return os.path.join(DATA_DIR, filename)
+
+
+def ensure_data_dir():
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+
+class _FileLock:
+    """DATA_DIR/.<filename>.lock 에 대한 flock (Python 프로세스 간 직렬화, Next.js 는 대상 아님)"""
+
+    def __init__(self, filename, exclusive):
+        self.path = data_path(f".{filename}.lock")
+        self.exclusive = exclusive
+        self.fd = None
+
+    def __enter__(self):
+        if FCNTL:
+            ensure_data_dir()
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def read_json(filename, default=None):
+    """JSON 파일 읽기. 변경이 없으면 캐시된 파싱 결과의 사본을 반환한다."""
+    path = data_path(filename)
+    key = _stat_key(path)
+    if key is None:
+        return copy.deepcopy(default)
+
+    with _cache_lock:
+        hit = _cache.get(path)
+    if hit and hit[:2] == key:
+        return copy.deepcopy(hit[2])
+
+    try:
+        with _FileLock(filename, exclusive=False):
+            key = _stat_key(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[storage] Error reading {filename}: {e}")
+        return copy.deepcopy(default)
+
+    if key is not None:
+        with _cache_lock:
+            _cache[path] = (key[0], key[1], data)
+    return copy.deepcopy(data)
+
+
+def write_json(filename, data):
+    """JSON 파일 원자적 쓰기. 디스크 내용과 같으면 건너뛰고 False 를 반환한다."""
+    ensure_data_dir()
+    with _FileLock(filename, exclusive=True):
+        return _write_json_locked(filename, data)
+
+
+def _write_json_locked(filename, data):
+    path = data_path(filename)
+    key = _stat_key(path)
+    with _cache_lock:
+        hit = _cache.get(path)
+    if hit and key is not None and hit[:2] == key and hit[2] == data:
+        return False
+
+    # lib/storage.ts 의 JSON.stringify(data, null, 2) 와 같은 형태
+    _replace(filename, json.dumps(data, ensure_ascii=False, indent=2))
+
+    key = _stat_key(path)
+    with _cache_lock:
+        _cache[path] = (key[0], key[1], copy.deepcopy(data))
+    return True
+
+
+def _replace(filename, text):
+    """임시 파일에 쓰고 os.replace 로 교체 (잠금은 호출자가 잡는다)"""
+    fd, tmp = tempfile.mkstemp(dir=DATA_DIR, prefix=f".{filename}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, data_path(filename))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _jsonl_line(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+
+def read_jsonl(filename):
+    """JSON Lines 읽기 (완성된 줄만). read_json 과 같은 (mtime, size) 캐시를 쓴다."""
+    path = data_path(filename)
+    key = _stat_key(path)
+    if key is None:
+        return []
+
+    with _cache_lock:
+        hit = _cache.get(path)
+    if hit and hit[:2] == key:
+        return copy.deepcopy(hit[2])
+
+    try:
+        with _FileLock(filename, exclusive=False):
+            key = _stat_key(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                data = [json.loads(line) for line in f if line.endswith("\n")]
+    except (OSError, ValueError) as e:
+        print(f"[storage] Error reading {filename}: {e}")
+        return []
+
+    if key is not None:
+        with _cache_lock:
+            _cache[path] = (key[0], key[1], data)
+    return copy.deepcopy(data)
+
+
+# --- 도메인 헬퍼 (types/index.ts 의 Slot / ScheduleData 포맷) ---
+def schedule_key(year, month):
+    return f"schedule_{year}_{month:02d}.json"
+
+
+def draft_key(year, month):
+    return f"draft_{year}_{month:02d}.jsonl"
+
+
+def slot_to_json(s):
+    return {"id": s['id'], "day": s['day'], "type": s['type'],
+            "owner": s['owner'], "isHeavy": s['is_heavy']}
+
+
+def slot_from_json(s):
+    return {"day": s['day'], "type": s['type'], "owner": s.get('owner'),
+            "id": s['id'], "is_heavy": s.get('isHeavy', False)}
+
+
+def load_members(default):
+    return read_json("members.json", default)
+
+
+def save_members(members):
+    return write_json("members.json", list(members))
+
+
+def load_schedule(year, month):
+    """schedule_YYYY_MM.json → Streamlit 슬롯 리스트 (없으면 None)"""
+    data = read_json(schedule_key(year, month))
+    if not data:
+        return None
+    return [slot_from_json(s) for s in data.get('slots', [])]
+
+
+def save_schedule(year, month, slots, draft_version=None):
+    """Streamlit 슬롯 → schedule_YYYY_MM.json.
+
+    draft_version=(seed, 이벤트 수) 를 주면 draft 게시로 보고,
+    - Python 이 마지막으로 쓴 뒤 다른 writer(Next.js /api/schedule 등)가 파일을 고쳤으면 쓰지 않고 False,
+    - 같은 draft 의 더 최신 상태가 이미 게시돼 있으면 쓰지 않는다 (True).
+    draft_version 이 None 이면(가져오기, 강제 덮어쓰기) 그대로 쓴다.
+    마지막으로 쓴 내용의 해시와 draft 버전은 .<filename>.published 에 남긴다.
+    """
+    filename = schedule_key(year, month)
+    path = data_path(filename)
+    ensure_data_dir()
+    with _FileLock(filename, exclusive=True):
+        if draft_version is not None and os.path.exists(path):
+            published = _read_published(filename)
+            if published.get('sha1') != _file_sha1(path):
+                return False
+            if published.get('seed') == draft_version[0] and published.get('events', 0) > draft_version[1]:
+                return True
+        _write_json_locked(filename, {
+            "year": year, "month": month, "slots": [slot_to_json(s) for s in slots]
+        })
+        seed, events = draft_version or (None, 0)
+        _replace(f".{filename}.published", json.dumps(
+            {"sha1": _file_sha1(path), "seed": seed, "events": events}))
+    return True
+
+
+def _file_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _read_published(filename):
+    try:
+        with open(data_path(f".{filename}.published"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# --- 추첨 기록 (draft.py 포맷) ---
+def load_draft(year, month):
+    """draft_YYYY_MM.jsonl → {헤더..., "events": [...]} (없으면 None)"""
+    lines = read_jsonl(draft_key(year, month))
+    if not lines:
+        return None
+    return {**lines[0], "events": lines[1:]}
+
+
+def init_draft(d):
+    """헤더 + 이벤트로 draft 파일을 새로 만든다 (기존 기록은 원자적으로 교체)"""
+    ensure_data_dir()
+    filename = draft_key(d['year'], d['month'])
+    header = {k: v for k, v in d.items() if k != 'events'}
+    with _FileLock(filename, exclusive=True):
+        _replace(filename, "".join(_jsonl_line(x) for x in [header, *d['events']]))
+
+
+def append_draft_event(year, month, expected, event):
+    """이벤트 한 줄 append. 파일의 이벤트 수가 expected 와 다르면(다른 세션이 먼저 기록) False"""
+    filename = draft_key(year, month)
+    path = data_path(filename)
+    with _FileLock(filename, exclusive=True):
+        try:
+            with open(path, 'rb') as f:
+                count = f.read().count(b"\n") - 1
+        except FileNotFoundError:
+            return False
+        if count != expected:
+            return False
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(_jsonl_line(event))
+    return True